@@ -0,0 +1,149 @@
+"""
+pytest configuration for the SEPI 2.0 robustness suite.
+
+By default every test runs offline: sepi.eutils_request is replaced with a fake
+that answers from the canned records below. Pass --live to query the real NCBI
+E-utilities instead (nightly runs).
+"""
+
+import asyncio
+import inspect
+import shutil
+from pathlib import Path
+
+import pytest
+
+import sepi
+
+HERE = Path(__file__).resolve().parent
+
+# Input files the tests refer to by relative path
+DATA_FILES = ["saureus_virulence.yml", "saureus_targets.txt"]
+
+# Canned NCBI protein records, keyed by protein name
+FIXTURES = {
+    "AcrA": {
+        "gi": "446860315",
+        "accession": "WP_000160892.1",
+        "definition": "multidrug efflux RND transporter periplasmic adaptor subunit AcrA [Escherichia coli]",
+        "organism": "Escherichia coli",
+        "strain": "K-12 substr. MG1655",
+        "sequence": "MNKNRGFTPLAVVLMLSGSLALTGCDDKQAQQGGQQMPAVGVVTVKTEPLQITTELPGRTSAYRIAEVRPQVSGIILKRNFKEGSDIEAGVSLYQIDPATYQATYDSAKGDLAKAQAAANIAQLTVNRYQKLLGTQYISKQEYDQALADAQQANAAVTAAKAAVETARINLAYTKVTSPISGRIGKSNVTEGALVQNGQATALATVQQLDPIYVDVTQPSNDFLRLKQELANGTLKQENGKAKVSLITSDGIKFPQDGTLEFSDVTVDQTTGSITLRAIFPNPDHTLLPGMFVRARLEEGLNPNAILVPQQGVTRTPRGDATVLVVGADDKVETRPIVASQAIGDKWLVTEGLKAGDRVVISGLQKVRPGVQVKAQEVTADNNQQAASGAQPEQSKS",
+    },
+    "AcrB": {
+        "gi": "446664797",
+        "accession": "WP_000742615.1",
+        "definition": "multidrug efflux RND transporter permease subunit AcrB [Escherichia coli]",
+        "organism": "Escherichia coli",
+        "strain": "K-12 substr. MG1655",
+        "sequence": "MPNFFIDRPIFAWVIAIIIMLAGGLAILKLPVAQYPTIAPPAVTISASYPGADAKTVQDTVTQVIEQNMNGIDNLMYMSSNSDSTGTVQITLTFESGTDADIAQVQVQNKLQLAMPLLPQEVQQQGVSVEKSSSSFLMVVGVINTDGTMTQEDISDYVAANMKDAISRTSGVGDVQLFGSQYAMRIWMNPNELNKFQLTPVDVITAIKAQNAQVAAGQLGGTPPVKGQQLNASIIAQTRLTSTEEFGKILLKVNQDGSRVLLRDVAKIELGGENYDIIAEFNGQPASGLGIKLATGANALDTAAAIRAELAKMEPFFPSGLKIVYPYDTTPFVKISIHEVVKTLVEAIILVFLVMYLFLQNFRATLIPTIAVPVVLLGTFAVLAAFGFSINTLTMFGMVLAIGLLVDDAIVVVENVERVMAEEGLPPKEATRKSMGQIQGALVGIAMVLSAVFVPMAFFGGSTGAIYRQFSITIVSAMALSVLVALILTPALCATMLKPIAKGDHGEGKKGFFGWFNRMFEKSTHHYTDSVGGILRSTGRYLVLYLIIVVGMAYLFVRLPSSFLPDEDQGVFMTMVQLPAGATQERTQKVLNEVTHYYLTKEKNNVESVFAVNGFGFAGRGQNTGIAFVSLKDWADRPGEENKVEAITMRATRAFSQIKDAMVFAFNLPAIVELGTATGFDFELIDQAGLGHEKLTQARNQLLAEAAKHPDMLTSVRPNGLEDTPQFKIDIDQEKAQALGVSINDINTTLGAAWGGSYVNDFIDRGRVKKVYVMSEAKYRMLPDDIGDWYVRAADGQMVPFSAFSSSRWEYGSPRLERYNGLPSMEILGQAAPGKSTGEAMELMEQLASKLPTGVGYDWTGMSYQERLSGNQAPSLYAISLIVVFLCLAALYESWSIPFSVMLVVPLGVIGALLAATFRGLTNDVYFQVGLLTTIGLSAKNAILIVEFAKDLMDKEGKGLIEATLDAVRMRLRPILMTSLAFILGVMPLVISTGAGSGAQNAVGTGVMGGMVTATVLAIFFVPVFFVVVRRRFSRKNEDIEHSHTVDHH",
+    },
+    "TolC": {
+        "gi": "446737434",
+        "accession": "WP_000735278.1",
+        "definition": "outer membrane channel protein TolC [Escherichia coli]",
+        "organism": "Escherichia coli",
+        "strain": "K-12 substr. MG1655",
+        "sequence": "MKKLLPILIGLSLSGFSSLSQAENLMQVYQQARLSNPELRKSAADRDAAFEKINEARSPLLPQLGLGADYTYSNGYRDANGINSNATSASLQLTQSIFDMSKWRALTLQEKAAGIQDVTYQTDQQTLILNTATAYFNVLNAIDVLSYTQAQKEAIYRQLDQTTQRFNVGLVAITDVQNARAQYDTVLANEVTARNNLDNAVEQLRQITGNYYPELAALNVENFKTDKPQPVNALLKEAEKRNLSLLQARLSQDLAREQIRQAQDGHLPTLDLTASTGISDTSYSGSKTRGAAGTQYDDSNMGQNKVGLSFSLPIYQGGMVNSQVKQAQYNFVGASEQLESAHRSVVQTVRSSFNNINASISSINAYKQAVVSAQSSLDAMEAGYSVGTRTIVDVLDATTTLYNAKQELANARYNYLINQLNIKSALGTLNEQDLLALNNALSKPVSTNPENVAPQTPEQNAIADGYAPDSPAPVVQQTSARTTTSNGHNPFRN",
+    },
+    "Hla": {
+        "gi": "446994962",
+        "accession": "WP_000783948.1",
+        "definition": "alpha-hemolysin [Staphylococcus aureus]",
+        "organism": "Staphylococcus aureus",
+        "strain": "NCTC 8325",
+        "sequence": "MKTRIVSSVTTTLLLGSILMNPVAGAADSDINIKTGTTDIGSNTTVKTGDLVTYDKENGMHKKVFYSFIDDKNHNKKLLVIRTKGTIAGQYRVYSEEGANKSGLAWPSAFKVQLQLPDNEVAQISDYYPRNSIDTKEYMSTLTYGFNGNVTGDDTGKIGGLIGANVSIGHTLKYVQPDFKTILESPTDKKVGWKVIFNNMVNQNWGPYDRDSWNPVYGNQLFMKTRNGSMKAAENFLDPNKASSLLSSGFSPDFATVITMDRKASKQQTNIDVIYERVRDDYQLHWTSTNWKGTNTKDKWTDRSSERYKIDWEKEEMTN",
+    },
+}
+
+
+def gbseq_xml(record: dict) -> str:
+    """Render a canned record the way efetch (rettype="gp", retmode="xml") returns it."""
+    return (
+        "<GBSeq>"
+        f"<GBSeq_length>{len(record['sequence'])}</GBSeq_length>"
+        f"<GBSeq_definition>{record['definition']}</GBSeq_definition>"
+        f"<GBSeq_accession-version>{record['accession']}</GBSeq_accession-version>"
+        "<GBSeq_other-seqids>"
+        f"<GBSeqid>ref|{record['accession']}|</GBSeqid>"
+        f"<GBSeqid>gi|{record['gi']}</GBSeqid>"
+        "</GBSeq_other-seqids>"
+        f"<GBSeq_organism>{record['organism']}</GBSeq_organism>"
+        "<GBSeq_feature-table><GBFeature>"
+        "<GBFeature_key>source</GBFeature_key>"
+        "<GBFeature_quals><GBQualifier>"
+        "<GBQualifier_name>strain</GBQualifier_name>"
+        f"<GBQualifier_value>{record['strain']}</GBQualifier_value>"
+        "</GBQualifier></GBFeature_quals>"
+        "</GBFeature></GBSeq_feature-table>"
+        f"<GBSeq_sequence>{record['sequence'].lower()}</GBSeq_sequence>"
+        "</GBSeq>"
+    )
+
+
+class FakeEutils:
+    """Stand-in for sepi.eutils_request that answers esearch/epost/efetch from FIXTURES."""
+
+    def __init__(self):
+        self.by_gi = {record["gi"]: record for record in FIXTURES.values()}
+        self.posted = {}  # WebEnv -> list of posted IDs
+
+    def __call__(self, utility: str, **params) -> bytes:
+        return getattr(self, utility)(**params).encode()
+
+    def esearch(self, term, **params):
+        ids = [
+            record["gi"] for name, record in FIXTURES.items()
+            if f'"{name}"[Protein Name]' in term and f'"{record["organism"]}"[Organism]' in term
+        ]
+        id_list = "".join(f"<Id>{gi}</Id>" for gi in ids)
+        return f"<eSearchResult><Count>{len(ids)}</Count><IdList>{id_list}</IdList></eSearchResult>"
+
+    def epost(self, id, **params):
+        webenv = f"MCID_FAKE_{len(self.posted)}"
+        self.posted[webenv] = id.split(",")
+        return f"<ePostResult><QueryKey>1</QueryKey><WebEnv>{webenv}</WebEnv></ePostResult>"
+
+    def efetch(self, WebEnv, **params):
+        records = [self.by_gi[gi] for gi in self.posted[WebEnv] if gi in self.by_gi]
+        return "<GBSet>" + "".join(gbseq_xml(record) for record in records) + "</GBSet>"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--live",
+        action="store_true",
+        default=False,
+        help="Query the real NCBI E-utilities instead of the canned fixtures."
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Run `async def` tests to completion on a fresh event loop."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    funcargs = pyfuncitem.funcargs
+    asyncio.run(pyfuncitem.obj(**{name: funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}))
+    return True
+
+
+@pytest.fixture
+def ncbi_records(request):
+    """The canned records NCBI answers from, by protein name; None with --live."""
+    return None if request.config.getoption("--live") else FIXTURES
+
+
+@pytest.fixture(autouse=True)
+def sepi_sandbox(request, monkeypatch, tmp_path):
+    """
+    Run each test in its own working directory with a fresh SEPI cache,
+    answering NCBI requests from FIXTURES unless --live is given.
+    """
+    for name in DATA_FILES:
+        shutil.copy(HERE / name, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sepi, "_CACHE", None)
+    monkeypatch.setattr(sepi, "_DIRTY", False)
+    if not request.config.getoption("--live"):
+        monkeypatch.setattr(sepi, "eutils_request", FakeEutils())
@@ -14,19 +14,37 @@ maximum reproducibility.
 """
 
 import argparse
+import atexit
+import csv
 import hashlib
 import json
 import logging
 import os
 import sys
+import threading
 import time
+import traceback
 import zipfile
-from io import StringIO
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
+from io import BytesIO, StringIO
 from pathlib import Path
 
-import pandas as pd
+import requests
 import yaml
-from Bio import Entrez, SeqIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml C parser, when PyYAML was built with it
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    import orjson  # Optional: much faster cache (de)serialization
+except ImportError:
+    orjson = None
 
 # --- Pre-configured Protein Lists (as per PRD section 3.2) ---
 
@@ -56,61 +74,252 @@ PROTEIN_CONFIG = {
     }
 }
 
+# Columns of the enriched accession report, in output order
+CSV_FIELDNAMES = ["Protein_Name", "Accession_Number", "Protein_Length", "Source_Strain", "NCBI_URL"]
+
+# Characters that are invalid in file names, mapped to '_' in a single str.translate pass
+_SAFE_FILENAME_TABLE = str.maketrans({c: '_' for c in '|/\\:*?"<>'})
+
 # --- Logging Configuration ---
 
+# --- NCBI Rate Limiting ---
+# NCBI allows 3 requests/second without an API key and 10 requests/second with one.
+NCBI_RATE_LIMIT = 3
+NCBI_RATE_LIMIT_WITH_KEY = 10
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter shared by all threads issuing NCBI requests.
+    Used as a context manager around each E-utilities call (see eutils_request()).
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._semaphore = threading.Semaphore(max(1, int(rate)))  # Bound requests in flight
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._last = time.monotonic()
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                # Refill at `rate` tokens/second; a capacity of one token means no bursts
+                self._tokens = min(1.0, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return self
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._semaphore.release()
+        return False
+
+
+ncbi_limiter = RateLimiter(NCBI_RATE_LIMIT)
+
+
+def configure_ncbi(email: str, api_key: str = None) -> int:
+    """
+    Set NCBI credentials once, before any worker threads start, and size the
+    shared rate limiter accordingly. Returns the allowed requests per second.
+    """
+    global ncbi_limiter
+    NCBI_PARAMS["email"] = email
+    rate = NCBI_RATE_LIMIT
+    if api_key:
+        NCBI_PARAMS["api_key"] = api_key
+        rate = NCBI_RATE_LIMIT_WITH_KEY
+    else:
+        NCBI_PARAMS.pop("api_key", None)
+    ncbi_limiter = RateLimiter(rate)
+    return rate
+
+# --- NCBI E-utilities Transport ---
+EUTILS_BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+NCBI_TIMEOUT = 60  # Seconds to wait for an E-utilities response
+NCBI_PARAMS = {"tool": "SEPI"}  # Sent with every request; email/api_key set by configure_ncbi()
+
+# One keep-alive session for every E-utilities call, so only the first request pays
+# for the TCP and TLS handshake. Retries mirror Biopython's handling of server errors.
+_http_session = requests.Session()
+_http_session.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=None)
+))
+
+def eutils_request(utility: str, **params) -> bytes:
+    """
+    Call an E-utility (e.g. "esearch", "efetch") over the shared HTTP session, within
+    the NCBI rate limit, and return the raw response body.
+    """
+    url = f"{EUTILS_BASE_URL}/{utility}.fcgi"
+    params = {**NCBI_PARAMS, **params}
+    with ncbi_limiter:
+        if utility == "epost":
+            # POST keeps long ID lists out of the URL
+            response = _http_session.post(url, data=params, timeout=NCBI_TIMEOUT)
+        else:
+            response = _http_session.get(url, params=params, timeout=NCBI_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
 # --- Caching Configuration ---
 CACHE_DIR = Path(".sepi_cache")
 CACHE_FILE = CACHE_DIR / "query_cache.json"
 CACHE_EXPIRY_HOURS = 24  # Cache entries expire after 24 hours
+NEGATIVE_CACHE_EXPIRY_HOURS = 1  # "Not found" results are retried sooner
 
 CACHE_DIR.mkdir(exist_ok=True)
+_CACHE = None  # In-memory copy of the cache file, loaded once on first use
+_DIRTY = False  # True when _CACHE holds entries not yet written to disk
+_CACHE_LOCK = threading.Lock()  # Guards _CACHE and _DIRTY across worker threads
+
+
+class CacheStats:
+    """Lookup counters for the query cache, updated under _CACHE_LOCK."""
+
+    def __init__(self):
+        self.hit_count = 0
+        self.miss_count = 0
+
+
+query_cache = CacheStats()  # Process-wide; cumulative across in-process main() calls
 
 def get_cache_key(query: str) -> str:
-    """Generate a cache key from the query string."""
-    return hashlib.md5(query.encode()).hexdigest()
+    """Generate a cache key from the query string (128-bit BLAKE2b; not security relevant)."""
+    return hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
+
+def read_cache_file() -> dict:
+    """Return the cache file's contents, or an empty dict if it is missing or unreadable."""
+    if not CACHE_FILE.exists():
+        return {}
+    try:
+        if orjson is not None:
+            return orjson.loads(CACHE_FILE.read_bytes())
+        with open(CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except Exception:
+        return {}
 
 def load_cache() -> dict:
-    """Load the cache from disk."""
-    if CACHE_FILE.exists():
-        try:
-            with open(CACHE_FILE, 'r') as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
+    """Load the cache from disk on first use and return the shared in-memory dict."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = read_cache_file()
+        return _CACHE
 
 def save_cache(cache: dict):
-    """Save the cache to disk."""
+    """
+    Save the cache to disk atomically via a temporary file.
+
+    Each process writes its whole snapshot, so entries other processes saved
+    since this one loaded the file are merged in first (the newer entry wins
+    per key). Parallel runs sharing .sepi_cache then only race in the short
+    window between that re-read and the replace.
+    """
     try:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(cache, f, indent=2)
+        CACHE_DIR.mkdir(exist_ok=True)
+        merged = read_cache_file()
+        for key, entry in cache.items():
+            if key not in merged or entry['timestamp'] >= merged[key].get('timestamp', 0):
+                merged[key] = entry
+        tmp_file = CACHE_FILE.with_name(f"{CACHE_FILE.name}.{os.getpid()}.tmp")
+        # Serialize in memory first so the file is written with a single call
+        if orjson is not None:
+            payload = orjson.dumps(merged)
+        else:
+            payload = json.dumps(merged).encode()
+        with open(tmp_file, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_file, CACHE_FILE)
     except Exception as e:
         logging.warning(f"Failed to save cache: {e}")
 
+def _flush_cache():
+    """Write the in-memory cache to disk if it has unsaved entries."""
+    global _DIRTY
+    with _CACHE_LOCK:
+        if _CACHE is not None and _DIRTY:
+            save_cache(_CACHE)
+            _DIRTY = False
+
+atexit.register(_flush_cache)
+
 def get_cached_result(cache_key: str) -> dict | str | None:
     """Get a cached result if it exists and hasn't expired."""
     cache = load_cache()
     if cache_key in cache:
         entry = cache[cache_key]
-        if time.time() - entry['timestamp'] < CACHE_EXPIRY_HOURS * 3600:
+        expiry_hours = entry.get('expiry_hours', CACHE_EXPIRY_HOURS)
+        if time.time() - entry['timestamp'] < expiry_hours * 3600:
+            with _CACHE_LOCK:
+                query_cache.hit_count += 1
             logging.info("Using cached result")
             return entry['result']
+    with _CACHE_LOCK:
+        query_cache.miss_count += 1
     return None
 
-def set_cached_result(cache_key: str, result):
-    """Cache a result."""
+def set_cached_result(cache_key: str, result, expiry_hours: float = None):
+    """
+    Cache a result in memory; it is written to disk by _flush_cache().
+    expiry_hours overrides CACHE_EXPIRY_HOURS for this entry.
+    """
+    global _DIRTY
     try:
         cache = load_cache()
-        cache[cache_key] = {
+        entry = {
             'timestamp': time.time(),
             'result': result
         }
-        save_cache(cache)
+        if expiry_hours is not None:
+            entry['expiry_hours'] = expiry_hours
+        with _CACHE_LOCK:
+            cache[cache_key] = entry
+            _DIRTY = True
     except Exception as e:
         logging.warning(f"Failed to cache result: {e}")
         # Continue without caching rather than crashing
 
 # --- Logging Configuration ---
+class BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler that lets a large file buffer batch its writes instead of flushing
+    after every record. Records at ERROR and above are still flushed immediately,
+    and the buffer is flushed when the handler is closed.
+    """
+
+    def __init__(self, filename: str, buffer_size: int = 1 << 16):
+        self.buffer_size = buffer_size
+        super().__init__(filename)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+def close_logging(logger: logging.Logger):
+    """Remove and close the logger's handlers, so buffered records reach disk and the log file is released."""
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+
 def setup_logging(output_name: str):
     """Setup logging to both console and file."""
     log_filename = f"{output_name}.log"
@@ -120,8 +329,7 @@ def setup_logging(output_name: str):
     logger.setLevel(logging.INFO)
 
     # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
+    close_logging(logger)
 
     # Create formatters
     formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
@@ -131,31 +339,121 @@ def setup_logging(output_name: str):
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
 
-    # File handler
-    file_handler = logging.FileHandler(log_filename)
+    # File handler (buffered; see BufferedFileHandler)
+    file_handler = BufferedFileHandler(log_filename)
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
 
     return logger
 
 
-def search_and_fetch_protein(protein_name: str, organism: str, email: str, assembly_level: str = None, biosample_query: str = None) -> tuple[str, str, dict] | None:
+# --- NCBI XML Parsing ---
+# E-utilities responses are scanned with iterparse, keeping only the few fields SEPI
+# uses instead of materializing full records.
+FASTA_LINE_WIDTH = 70  # Matches NCBI's own FASTA output
+
+def parse_esearch_first_id(handle) -> str | None:
     """
-    Constructs a query, searches NCBI, and fetches the top protein sequence.
-    Includes a fallback mechanism to relax search criteria if the initial search fails.
-    Now supports arbitrary organisms and advanced filtering.
+    Return the first ID of an esearch result, or None if nothing matched.
+    Raises RuntimeError if NCBI reports an <ERROR>, so a failed search is not
+    mistaken for (and cached as) a genuine "no match".
+    """
+    first_id = None
+    for _, elem in ET.iterparse(handle):
+        if elem.tag == "ERROR":
+            raise RuntimeError(f"esearch error: {elem.text}")
+        if elem.tag == "Id" and first_id is None:
+            first_id = elem.text
+    return first_id
+
+def parse_epost_history(handle) -> dict:
+    """Return the history server parameters (WebEnv, query_key) from an epost result."""
+    history = {}
+    for _, elem in ET.iterparse(handle):
+        if elem.tag == "WebEnv":
+            history["WebEnv"] = elem.text
+        elif elem.tag == "QueryKey":
+            history["query_key"] = elem.text
+    if len(history) != 2:
+        raise ValueError("EPost response did not include WebEnv and QueryKey")
+    return history
+
+def format_fasta(accession: str, definition: str, sequence: str) -> str:
+    """Format a protein record as FASTA text, laid out the way NCBI's efetch returns it."""
+    lines = [f">{accession} {definition}".rstrip()]
+    lines += [sequence[i:i + FASTA_LINE_WIDTH] for i in range(0, len(sequence), FASTA_LINE_WIDTH)]
+    return "\n".join(lines) + "\n\n"
+
+def parse_gbseq_records(handle) -> list[dict]:
+    """
+    Return one dict per GBSeq of an efetch (rettype="gp", retmode="xml") result,
+    holding its GI, accession, FASTA text and the metadata fields SEPI reports.
+    """
+    records = []
+    for _, elem in ET.iterparse(handle):
+        if elem.tag != "GBSeq":
+            continue
+        accession = elem.findtext("GBSeq_accession-version", "")
+        sequence = elem.findtext("GBSeq_sequence", "").upper()
+        definition = elem.findtext("GBSeq_definition", "")
+
+        gi = None
+        for seqid in elem.iterfind("GBSeq_other-seqids/GBSeqid"):
+            if seqid.text and seqid.text.startswith("gi|"):
+                gi = seqid.text[3:]
+                break
+
+        # Strain comes from the qualifiers of the record's source feature
+        strain = None
+        for qualifier in elem.iterfind("GBSeq_feature-table/GBFeature/GBFeature_quals/GBQualifier"):
+            if qualifier.findtext("GBQualifier_name") == "strain":
+                strain = qualifier.findtext("GBQualifier_value")
+                break
+
+        records.append({
+            'gi': gi,
+            'accession': accession,
+            'fasta': format_fasta(accession, definition, sequence),
+            'length': int(elem.findtext("GBSeq_length") or len(sequence)),
+            'strain': strain,
+            'title': definition,
+            'organism': elem.findtext("GBSeq_organism", ""),
+        })
+        elem.clear()  # Free the parsed subtree as we go
+    return records
+
+
+def resolve_organism(organism: str) -> tuple[str, dict]:
+    """
+    Returns the full NCBI organism name and the strain-specific overrides for an organism.
+    Handles both legacy hardcoded organisms and new arbitrary organisms.
     """
-    Entrez.email = email
-
-    # Handle both legacy hardcoded organisms and new arbitrary organisms
     if organism in PROTEIN_CONFIG:
         config = PROTEIN_CONFIG[organism]
-        organism_full_name = config["organism_name"]
-        strain = config["strain_specific"].get(protein_name)
-    else:
-        # For arbitrary organisms, use the organism string directly
-        organism_full_name = organism
-        strain = None
+        return config["organism_name"], config["strain_specific"]
+    # For arbitrary organisms, use the organism string directly
+    return organism, {}
+
+
+def search_protein_id(protein_name: str, organism_full_name: str, strain: str = None, assembly_level: str = None, biosample_query: str = None) -> str | None:
+    """
+    Constructs a query, searches NCBI, and returns the ID of the top protein hit.
+    Includes a fallback mechanism to relax search criteria if the initial search fails.
+    Now supports arbitrary organisms and advanced filtering.
+    Safe to call from multiple threads; NCBI credentials are set by configure_ncbi().
+    The organism and strain are resolved once by the caller (see resolve_organism()).
+    The matching records are retrieved afterwards in bulk by fetch_protein_records().
+    """
+    # Check cache first: one entry per protein and filter set covers every fallback query,
+    # so a cached hit (or recent miss) skips all search attempts
+    cache_key = get_cache_key(f"protein_fetch:{organism_full_name}:{strain}:{protein_name}:{assembly_level}:{biosample_query}")
+    cached_result = get_cached_result(cache_key)
+    if cached_result:
+        if isinstance(cached_result, dict) and cached_result.get("negative"):
+            logging.warning(f"'{protein_name}' was recently not found on NCBI (cached); skipping search.")
+            return None
+        logging.info(f"Using cached result for '{protein_name}'")
+        return cached_result
 
     base_query_parts = [
         f'"{organism_full_name}"[Organism]',
@@ -203,77 +501,91 @@ def search_and_fetch_protein(protein_name: str, organism: str, email: str, assem
         logging.info(f"  Query {i}: {query}")
 
     protein_id = None
+    search_errors = False
     for i, query in enumerate(queries):
-        cache_key = get_cache_key(f"search_{query}")
-        cached_result = get_cached_result(cache_key)
-
-        # Check cache first
-        cached_result = get_cached_result(cache_key)
-        if cached_result:
-            logging.info(f"Using cached result for '{protein_name}'")
-            return cached_result
-    
         try:
             logging.info(f"Searching for '{protein_name}' (Attempt {i+1})...")
     
-            handle = Entrez.esearch(db="protein", term=query, retmax=1)
-            record = Entrez.read(handle)
-            handle.close()
-            time.sleep(0.35)  # Adhere to NCBI's limit
+            response = eutils_request("esearch", db="protein", term=query, retmax=1)
+            found_id = parse_esearch_first_id(BytesIO(response))
         except Exception as e:
             logging.error(f"An error occurred during search attempt {i+1} for '{protein_name}': {e}")
+            search_errors = True
             continue # Try next query
     
-        if record["IdList"]:
-            protein_id = record["IdList"][0]
+        if found_id:
+            protein_id = found_id
             logging.info(f"Found a candidate for '{protein_name}' on Attempt {i+1}.")
             break # Exit the loop once an ID is found
 
     if not protein_id:
         logging.warning(f"All search attempts failed for '{protein_name}'. No entry found.")
+        # Only remember a genuine "no match", not a search that failed on network errors
+        if not search_errors:
+            set_cached_result(cache_key, {"negative": True}, expiry_hours=NEGATIVE_CACHE_EXPIRY_HOURS)
         return None
 
-    # Fetch the record using the found ID
+    # Cache the resolved ID; the record itself is cached by fetch_protein_records()
+    set_cached_result(cache_key, protein_id)
+
+    return protein_id
+
+
+def fetch_protein_records(protein_ids: list[str]) -> dict[str, tuple[str, str, dict]]:
+    """
+    Fetches FASTA sequences and metadata for many protein IDs in one batched pass.
+    The IDs are uploaded once with EPost, then every record is retrieved from NCBI's
+    history server with a single GenPept XML efetch carrying sequence and metadata.
+    Returns a mapping of protein ID to (accession, fasta_data, metadata).
+    """
+    records = {}
+    missing_ids = []
+    for protein_id in dict.fromkeys(protein_ids):
+        cached_record = get_cached_result(get_cache_key(f"record_{protein_id}"))
+        if cached_record:
+            records[protein_id] = tuple(cached_record)
+        else:
+            missing_ids.append(protein_id)
+
+    if not missing_ids:
+        return records
+
     try:
-        # Fetch FASTA sequence (temporarily disable caching)
-        fetch_handle = Entrez.efetch(db="protein", id=protein_id, rettype="fasta", retmode="text")
-        fasta_data = fetch_handle.read()
-        fetch_handle.close()
-        time.sleep(0.35)
-
-        fasta_io = StringIO(fasta_data)
-        seq_record = SeqIO.read(fasta_io, "fasta")
-        accession = seq_record.id
-        protein_length = len(seq_record.seq)
-
-        # Fetch additional metadata
-        summary_handle = Entrez.esummary(db="protein", id=protein_id)
-        summary_record = Entrez.read(summary_handle)
-        summary_handle.close()
-        time.sleep(0.35)
+        logging.info(f"Fetching {len(missing_ids)} record(s) from NCBI in one batch...")
+        response = eutils_request("epost", db="protein", id=",".join(missing_ids))
+        history = parse_epost_history(BytesIO(response))
+
+        # One GenPept XML fetch returns both the sequences and their metadata
+        response = eutils_request("efetch", db="protein", rettype="gp", retmode="xml", retmax=len(missing_ids), **history)
+        gbseq_records = parse_gbseq_records(BytesIO(response))
+    except Exception as e:
+        logging.error(f"Failed to fetch {len(missing_ids)} record(s) from NCBI: {e}")
+        return records
+
+    # Match records to IDs by GI; fall back to request order if the counts agree
+    positional = len(gbseq_records) == len(missing_ids)
+
+    for index, gbseq in enumerate(gbseq_records):
+        protein_id = gbseq['gi'] or (missing_ids[index] if positional else None)
+        if not protein_id:
+            logging.warning(f"Could not match accession {gbseq['accession']} to a requested ID; skipping it")
+            continue
 
         # Extract metadata
-        metadata = {}
-        if summary_record and len(summary_record) > 0:
-            record = summary_record[0]
-            metadata = {
-                'protein_length': protein_length,
-                'source_strain': record.get('Caption', 'N/A'),  # Often contains strain info
-                'ncbi_url': f"https://www.ncbi.nlm.nih.gov/protein/{protein_id}",
-                'title': record.get('Title', ''),
-                'organism': record.get('Organism', organism_full_name)
-            }
-
-        logging.info(f"Successfully retrieved '{protein_name}' with Accession: {accession}")
+        accession = gbseq['accession']
+        metadata = {
+            'protein_length': gbseq['length'],
+            'source_strain': gbseq['strain'] or 'N/A',
+            'ncbi_url': f"https://www.ncbi.nlm.nih.gov/protein/{protein_id}",
+            'title': gbseq['title'],
+            'organism': gbseq['organism']
+        }
 
         # Cache the result
-        result_to_cache = (accession, fasta_data, metadata)
-        set_cached_result(cache_key, result_to_cache)
+        records[protein_id] = (accession, gbseq['fasta'], metadata)
+        set_cached_result(get_cache_key(f"record_{protein_id}"), records[protein_id])
 
-        return accession, fasta_data, metadata
-    except Exception as e:
-        logging.error(f"Found ID {protein_id} but failed to fetch the record for '{protein_name}': {e}")
-        return None
+    return records
 
 
 def generate_html_report(args, results, target_proteins):
@@ -282,7 +594,8 @@ def generate_html_report(args, results, target_proteins):
     successful_proteins = len(results)
     failed_proteins = total_proteins - successful_proteins
 
-    html_content = f"""
+    # Collect the page in pieces and join once; repeated += is quadratic for large runs
+    html_parts = [f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -344,10 +657,10 @@ def generate_html_report(args, results, target_proteins):
             </tr>
         </thead>
         <tbody>
-"""
+"""]
 
     for result in results:
-        html_content += f"""
+        html_parts.append(f"""
             <tr>
                 <td>{result['Protein_Name']}</td>
                 <td>{result['Accession_Number']}</td>
@@ -355,9 +668,9 @@ def generate_html_report(args, results, target_proteins):
                 <td>{result['Source_Strain']}</td>
                 <td><a href="{result['NCBI_URL']}" target="_blank">View on NCBI</a></td>
             </tr>
-"""
+""")
 
-    html_content += """
+    html_parts.append("""
         </tbody>
     </table>
 
@@ -367,13 +680,63 @@ def generate_html_report(args, results, target_proteins):
     </div>
 </body>
 </html>
-"""
+""")
+
+    return "".join(html_parts)
+
 
-    return html_content
+_IN_WORKER = False  # Set by run_worker(); a request cannot start a nested worker
 
 
-def main():
-    """Main function to parse arguments and run the SEPI workflow."""
+def run_worker():
+    """
+    Serve SEPI runs to a long-lived parent process (used by the test suite),
+    keeping the interpreter and imports warm between runs.
+    Reads one JSON request {"argv": [...]} per stdin line and answers each with
+    one JSON line {"rc": ..., "stdout": ..., "stderr": ..., "cache_hits": ...} on
+    stdout, where cache_hits counts the run's query cache hits.
+    """
+    global _CACHE, _IN_WORKER
+    _IN_WORKER = True
+    channel = sys.stdout
+
+    def reply(rc, stdout="", stderr="", cache_hits=0):
+        channel.write(json.dumps({"rc": rc, "stdout": stdout, "stderr": stderr, "cache_hits": cache_hits}) + "\n")
+        channel.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            argv = json.loads(line)["argv"]
+            if not isinstance(argv, list):
+                raise TypeError(f"argv must be a list, not {type(argv).__name__}")
+        except (ValueError, KeyError, TypeError) as e:
+            # Answer a malformed request like a usage error rather than dying
+            reply(2, stderr=f"Invalid worker request {line.strip()!r}: {e!r}\n")
+            continue
+
+        # Start from the on-disk cache, as a fresh process would
+        _flush_cache()
+        with _CACHE_LOCK:
+            _CACHE = None
+
+        hits_before = query_cache.hit_count
+        stdout, stderr = StringIO(), StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                main(argv)
+                rc = 0
+            except SystemExit as e:
+                rc = e.code if isinstance(e.code, int) else int(e.code is not None)
+            except Exception:
+                traceback.print_exc()
+                rc = 1
+        reply(rc, stdout.getvalue(), stderr.getvalue(), query_cache.hit_count - hits_before)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build SEPI's command-line parser (also used by the test suite to check argument validation)."""
     parser = argparse.ArgumentParser(
         description="SEPI 2.0: A versatile bioinformatics platform for automated acquisition of reference protein sequences from NCBI.",
         epilog="Example: python sepi.py --organism \"Pseudomonas aeruginosa PAO1\" --proteins \"dnaA,recA\" --assembly_level complete_genome --output PAO1_refs --email user@example.com"
@@ -424,21 +787,62 @@ def main():
         action="store_true",
         help="Generate an HTML summary report of the run."
     )
+    parser.add_argument(
+        "--zip_level",
+        type=int,
+        choices=[0, 1, 6, 9],
+        default=1,
+        help="Compression level for the FASTA ZIP archive; 0 stores files uncompressed. (Default: 1)"
+    )
     parser.add_argument(
         "--email",
         help="Your email address (required by NCBI for API usage)."
     )
+    parser.add_argument(
+        "--api_key",
+        type=str,
+        help="NCBI API key. Raises the request rate limit from 3 to 10 requests/second."
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Serve runs as JSON lines over stdin/stdout instead of running once (used by the test suite)."
+    )
 
-    args = parser.parse_args()
+    return parser
 
-    # Setup logging
+
+def main(argv=None):
+    """Main function to parse arguments and run the SEPI workflow.
+
+    `argv` defaults to sys.argv[1:]; passing a list lets callers (such as the
+    test suite) run SEPI in-process.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.worker:
+        if _IN_WORKER:
+            # A nested worker would answer into the captured output and break the protocol
+            parser.error("--worker cannot be used in a worker request")
+        run_worker()
+        return
+
+    # Setup logging; the run's handlers are closed again however it ends, so
+    # in-process callers (and run_worker()) don't keep writing to its log file
     logger = setup_logging(args.output)
+    try:
+        run_workflow(args)
+    finally:
+        close_logging(logger)
 
+
+def run_workflow(args: argparse.Namespace):
+    """Run the SEPI workflow for parsed command-line arguments (see main())."""
     # Load configuration from YAML file if provided
     if args.config:
         try:
             with open(args.config, 'r') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=SafeLoader)
             # Override command line args with config values
             for key, value in config.items():
                 if key == 'settings':
@@ -489,6 +893,12 @@ def main():
         logging.error("No protein names provided. Exiting.")
         sys.exit(1)
 
+    # Drop duplicate protein names (keeping the first occurrence) so each is fetched once
+    target_proteins = list(dict.fromkeys(target_proteins))
+
+    # Set NCBI credentials once so worker threads never race on the shared request parameters
+    rate_limit = configure_ncbi(args.email, args.api_key)
+
     logging.info(f"Starting SEPI 2.0 for organism: '{args.organism}'")
     logging.info(f"Target proteins: {', '.join(target_proteins)}")
     logging.info(f"Output file base name: '{args.output}'")
@@ -499,69 +909,107 @@ def main():
 
     # --- Workflow Execution ---
     results = []
-    all_fasta_sequences = []
-    output_dir = Path(f"{args.output}_fasta_files")
-    output_dir.mkdir(exist_ok=True)
-
-    for protein in target_proteins:
-        fetched_data = search_and_fetch_protein(
-            protein, args.organism, args.email,
-            args.assembly_level, args.biosample_query
-        )
-        if fetched_data:
-            accession, fasta_sequence, metadata = fetched_data
-            result_entry = {
-                "Protein_Name": protein,
-                "Accession_Number": accession,
-                "Protein_Length": metadata.get('protein_length', 'N/A'),
-                "Source_Strain": metadata.get('source_strain', 'N/A'),
-                "NCBI_URL": metadata.get('ncbi_url', f"https://www.ncbi.nlm.nih.gov/protein/{accession}")
-            }
-            results.append(result_entry)
-            all_fasta_sequences.append(fasta_sequence)
-
-            # Save individual FASTA file
-            # Sanitize accession number to remove invalid filename characters
-            safe_accession = accession.replace('|', '_').replace('/', '_').replace('\\', '_').replace(':', '_').replace('*', '_').replace('?', '_').replace('"', '_').replace('<', '_').replace('>', '_')
-            file_name = f"{protein}_{safe_accession}.fasta"
-            file_path = output_dir / file_name
-            with open(file_path, "w") as f_out:
-                f_out.write(fasta_sequence)
-        else:
-            logging.warning(f"Skipping protein '{protein}' - not found or failed to retrieve")
+
+    # 1. Resolve protein names to NCBI IDs concurrently; the shared rate limiter keeps us within NCBI's limits
+    organism_full_name, strain_lookup = resolve_organism(args.organism)  # Once, not per protein
+    protein_ids = {}
+    with ThreadPoolExecutor(max_workers=min(len(target_proteins), rate_limit)) as executor:
+        futures = {
+            executor.submit(
+                search_protein_id, protein, organism_full_name, strain_lookup.get(protein),
+                args.assembly_level, args.biosample_query
+            ): protein
+            for protein in target_proteins
+        }
+        for future in as_completed(futures):
+            protein = futures[future]
+            try:
+                protein_ids[protein] = future.result()
+            except Exception as e:
+                logging.error(f"Unexpected error while searching for '{protein}': {e}")
+                protein_ids[protein] = None
+
+    # 2. Retrieve every found record in one batched pass via the NCBI history server
+    found_ids = [protein_id for protein_id in protein_ids.values() if protein_id]
+    records = fetch_protein_records(found_ids) if found_ids else {}
+    _flush_cache()  # Persist new cache entries now that all network work is done
+
+    # 3. Map the records back to protein names in the original order, streaming each
+    #    FASTA sequence straight into the ZIP archive (and the multi-FASTA file, if requested)
+    zip_filename = f"{args.output}.zip"
+    multi_fasta_filename = f"{args.output}.fasta"
+    # FASTA text gains little from heavy compression, so default to the fastest deflate level
+    if args.zip_level == 0:
+        zip_options = {"compression": zipfile.ZIP_STORED}
+    else:
+        zip_options = {"compression": zipfile.ZIP_DEFLATED, "compresslevel": args.zip_level}
+    write_error = None  # First failure writing the FASTA outputs; results are still collected
+    try:
+        with ExitStack() as outputs:
+            zipf = multi_fp = None
+            for protein in target_proteins:
+                fetched_data = records.get(protein_ids.get(protein))
+                if not fetched_data:
+                    logging.warning(f"Skipping protein '{protein}' - not found or failed to retrieve")
+                    continue
+                accession, fasta_sequence, metadata = fetched_data
+                logging.info(f"Successfully retrieved '{protein}' with Accession: {accession}")
+                result_entry = {
+                    "Protein_Name": protein,
+                    "Accession_Number": accession,
+                    "Protein_Length": metadata.get('protein_length', 'N/A'),
+                    "Source_Strain": metadata.get('source_strain', 'N/A'),
+                    "NCBI_URL": metadata.get('ncbi_url', f"https://www.ncbi.nlm.nih.gov/protein/{accession}")
+                }
+                results.append(result_entry)
+                if write_error is not None:
+                    continue
+                try:
+                    if zipf is None:
+                        # Opened on the first hit, so a run that retrieves nothing writes no files
+                        zipf = outputs.enter_context(zipfile.ZipFile(zip_filename, 'w', **zip_options))
+                        if args.multi_fasta:
+                            multi_fp = outputs.enter_context(open(multi_fasta_filename, "w", buffering=1 << 20))
+                    # Add individual FASTA file to the archive
+                    # Sanitize accession number to remove invalid filename characters
+                    safe_accession = accession.translate(_SAFE_FILENAME_TABLE)
+                    zipf.writestr(f"{protein}_{safe_accession}.fasta", fasta_sequence)
+                    if multi_fp is not None:
+                        multi_fp.write(fasta_sequence)
+                except Exception as e:
+                    write_error = e
+    except Exception as e:  # Finishing a file failed (e.g. writing the ZIP directory)
+        write_error = write_error or e
 
     if not results:
         logging.warning("No proteins were successfully retrieved. No output files will be generated.")
-        # Clean up empty directory
-        try:
-            os.rmdir(output_dir)
-        except OSError:
-            pass
         sys.exit(0)
 
+    if write_error is not None:
+        if args.multi_fasta:
+            logging.error(f"Failed to create ZIP archive or multi-FASTA file: {write_error}")
+        else:
+            logging.error(f"Failed to create ZIP archive: {write_error}")
+    else:
+        logging.info(f"FASTA files packaged into '{zip_filename}'")
+        if args.multi_fasta:
+            logging.info(f"Multi-FASTA file saved to '{multi_fasta_filename}'")
+
     # --- Generate Output Files ---
 
     # 1. Enhanced CSV Accession Report
     csv_filename = f"{args.output}_accessions.csv"
     try:
-        df = pd.DataFrame(results)
-        df.to_csv(csv_filename, index=False)
+        with open(csv_filename, "w", newline="", buffering=1 << 16) as csv_file:
+            # "\n" line endings, as the earlier pandas to_csv output had (csv defaults to "\r\n")
+            writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDNAMES, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(results)
         logging.info(f"Enriched accession report saved to '{csv_filename}'")
     except Exception as e:
         logging.error(f"Failed to create CSV report: {e}")
 
-    # 2. Multi-FASTA file (if requested)
-    if args.multi_fasta:
-        multi_fasta_filename = f"{args.output}.fasta"
-        try:
-            with open(multi_fasta_filename, "w") as f_out:
-                for fasta_seq in all_fasta_sequences:
-                    f_out.write(fasta_seq)
-            logging.info(f"Multi-FASTA file saved to '{multi_fasta_filename}'")
-        except Exception as e:
-            logging.error(f"Failed to create multi-FASTA file: {e}")
-
-    # 3. HTML Report (if requested)
+    # 2. HTML Report (if requested)
     if args.html_report:
         html_filename = f"{args.output}_report.html"
         try:
@@ -572,18 +1020,6 @@ def main():
         except Exception as e:
             logging.error(f"Failed to create HTML report: {e}")
 
-    # 4. Create ZIP Archive
-    zip_filename = f"{args.output}.zip"
-    try:
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for fasta_file in output_dir.glob("*.fasta"):
-                zipf.write(fasta_file, arcname=fasta_file.name)
-                os.remove(fasta_file) # Clean up individual file after adding to zip
-        os.rmdir(output_dir) # Clean up the temporary directory
-        logging.info(f"FASTA files packaged into '{zip_filename}'")
-    except Exception as e:
-        logging.error(f"Failed to create ZIP archive: {e}")
-
     logging.info("SEPI 2.0 run completed successfully.")
 
 
@@ -2,248 +2,938 @@
 """
 Comprehensive robustness test for SEPI 2.0
 Tests all features and edge cases to ensure production readiness.
+
+Run directly (`python test_sepi_robustness.py`) for the live suite, spread
+across a pool of warm `sepi.py --worker` processes, or with pytest, where NCBI
+is replaced by canned fixtures (see conftest.py) and the command tables below
+are spread across cores by pytest-xdist.
 """
 
+import argparse
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import csv
+import hashlib
+import io
+import json
+import logging
+import logging.handlers
 import os
+import queue
+import shlex
 import sys
 import subprocess
 import tempfile
 import shutil
+import threading
+import time
+import traceback
+import uuid
+import zipfile
+from collections import deque
 from pathlib import Path
 
-def run_command(cmd, description, expect_failure=False):
-    """Run a command and return success status."""
-    print(f"\n[*] Testing: {description}")
-    print(f"Command: {cmd}")
+import pytest
+import yaml
+
+import sepi
+
+log = logging.getLogger(__name__)
+
+# Name of the test group a record belongs to; asyncio tasks and
+# asyncio.to_thread copy it, so a group's concurrent steps all carry it
+current_test = contextvars.ContextVar("current_test", default=None)
+
+class _GroupNameFilter(logging.Filter):
+    """Prefix each record with the test group that emitted it."""
+    def filter(self, record):
+        name = current_test.get()
+        record.prefix = f"[{name}] " if name else ""
+        return True
+
+HERE = Path(__file__).resolve().parent
+SEPI_PATH = HERE / "sepi.py"
+
+# Interpreter and script for every command, resolved once: no PATH lookup, and
+# never a different `python` than the one running the suite
+PY = sys.executable
+SEPI = str(SEPI_PATH)
+
+# Suite options as used under pytest; main() replaces these from the command line.
+# pytest runs in-process, so the conftest fixtures apply; xdist supplies the parallelism.
+OPTIONS = argparse.Namespace(
+    in_process=True, subprocess=False, workers=False, no_cache=True, refresh=False, fail_fast=False
+)
+
+# --- Result cache: outcomes of passing commands from earlier suite runs ---
+RESULT_CACHE_DIR = Path(".sepi_testcache")
+RESULT_CACHE_EXPIRY_HOURS = 24
+
+COMMAND_TIMEOUT = 300  # Seconds before a command is killed
+OUTPUT_TAIL_BYTES = 4096  # Output kept per stream, for failure reports
+
+# Each suite run writes its outputs into its own directory under one scratch root
+TEST_RUNS_ROOT = Path("_sepi_test_runs")
+RUN_DIR = TEST_RUNS_ROOT / uuid.uuid4().hex
+
+# Name prefixes of stray outputs swept from the working directory on cleanup
+PREFIXES = ('test_', 'ecoli_test', 'SEPI_output')
+
+# Static input files for the error-path tests, staged once per session
+_FIXTURES_DIR = Path(tempfile.mkdtemp(prefix="sepi_fix_"))
+atexit.register(shutil.rmtree, _FIXTURES_DIR, ignore_errors=True)
+EMPTY_PROTEIN_LIST = _FIXTURES_DIR / "empty.txt"
+INVALID_YAML = _FIXTURES_DIR / "invalid.yml"
+EMPTY_PROTEIN_LIST.write_text("")
+INVALID_YAML.write_text("invalid: yaml: content: [\n")
+
+# sepi.main() reads process-wide state (logging handlers, stdout), so only
+# one in-process run may execute at a time: in-process mode is serial, and
+# parallel runs need separate processes (--workers, --subprocess or xdist)
+_IN_PROCESS_LOCK = threading.RLock()
+
+def run_in_process(cmd):
+    """Run a `[PY, SEPI, ...]` argv list through sepi.main() in this interpreter, one run at a time."""
+    argv = cmd[2:]
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with _IN_PROCESS_LOCK, contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            sepi.main(argv)
+            returncode = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                returncode = e.code or 0
+            else:
+                print(e.code, file=stderr)
+                returncode = 1
+        except Exception:
+            traceback.print_exc(file=stderr)
+            returncode = 1
+    return subprocess.CompletedProcess(argv, returncode, stdout.getvalue(), stderr.getvalue())
+
+async def _drain(stream, tail):
+    """Read a pipe to EOF, keeping only what fits in the `tail` ring buffer."""
+    while chunk := await stream.read(65536):
+        tail.extend(chunk)
+
+async def stream_subprocess(cmd, timeout=COMMAND_TIMEOUT):
+    """
+    Run an argv list, reading its output incrementally as it is produced.
+
+    Only the last OUTPUT_TAIL_BYTES of stdout and stderr are retained, so
+    concurrent long runs never hold their full output in memory.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout_tail = deque(maxlen=OUTPUT_TAIL_BYTES)
+    stderr_tail = deque(maxlen=OUTPUT_TAIL_BYTES)
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(_drain(proc.stdout, stdout_tail), _drain(proc.stderr, stderr_tail), proc.wait()),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return subprocess.CompletedProcess(
+        cmd, proc.returncode,
+        bytes(stdout_tail).decode(errors="replace"),
+        bytes(stderr_tail).decode(errors="replace")
+    )
+
+class WorkerPool:
+    """
+    Pre-warmed `python sepi.py --worker` processes, each running one command at
+    a time. Idle workers wait in a queue; a command takes the next free one.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._idle = asyncio.Queue()
+
+    async def _spawn(self):
+        return await asyncio.create_subprocess_exec(
+            PY, SEPI, "--worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=1 << 24  # Each reply is one JSON line holding a run's full output
+        )
+
+    async def start(self):
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._spawn())
+
+    async def _replace(self, proc):
+        """Stop a failed worker and put a fresh one in its place, so the pool never shrinks."""
+        if proc.returncode is None:
+            proc.kill()
+        returncode = await proc.wait()
+        self._idle.put_nowait(await self._spawn())
+        return returncode
+
+    async def run(self, cmd, timeout=COMMAND_TIMEOUT):
+        """Run a `[PY, SEPI, ...]` argv list on the next idle worker."""
+        proc = await self._idle.get()
+        if proc.returncode is not None:
+            # Died while idle; the command has not been sent anywhere yet
+            proc = await self._spawn()
+        try:
+            proc.stdin.write((json.dumps({"argv": cmd[2:]}) + "\n").encode())
+            await proc.stdin.drain()
+            line = await asyncio.wait_for(proc.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            await self._replace(proc)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        except OSError as e:  # ConnectionResetError, BrokenPipeError: the worker is gone
+            returncode = await self._replace(proc)
+            return subprocess.CompletedProcess(cmd, returncode or 1, "", f"sepi.py --worker connection lost: {e}")
+        if not line:
+            # The worker died mid-run; replace it
+            returncode = await self._replace(proc)
+            return subprocess.CompletedProcess(cmd, returncode or 1, "", "sepi.py --worker exited unexpectedly")
+        self._idle.put_nowait(proc)
+
+        reply = json.loads(line)
+        result = subprocess.CompletedProcess(
+            cmd, reply["rc"],
+            reply["stdout"][-OUTPUT_TAIL_BYTES:],
+            reply["stderr"][-OUTPUT_TAIL_BYTES:]
+        )
+        result.cache_hits = reply["cache_hits"]  # SEPI query cache hits during the run
+        return result
+
+    async def close(self):
+        while not self._idle.empty():
+            proc = self._idle.get_nowait()
+            proc.stdin.close()
+            await proc.wait()
+
+_worker_pool = None  # Started by run_suite() with --workers
+
+def runs_in_process():
+    """True unless commands go to fresh interpreters (--subprocess) or worker processes (--workers)."""
+    return not (OPTIONS.subprocess or OPTIONS.workers)
+
+def run_mode():
+    """Name of the current execution mode (part of every result cache key)."""
+    if OPTIONS.subprocess:
+        return "subprocess"
+    if OPTIONS.workers:
+        return "workers"
+    return "in-process"
+
+async def execute(cmd):
+    """Run an argv list on a warm worker (--workers), in a fresh interpreter (--subprocess) or in-process."""
+    RUN_DIR.mkdir(parents=True, exist_ok=True)  # Relative, so created in the current working directory
+    if OPTIONS.subprocess:
+        return await stream_subprocess(cmd)
+    if OPTIONS.workers:
+        return await _worker_pool.run(cmd)
+    # sepi.main() blocks, so keep it off the event loop
+    return await asyncio.to_thread(run_in_process, cmd)
+
+def result_cache_path(cmd):
+    """
+    Return the result cache file for an argv list in the current mode, ignoring
+    its per-run --output prefix. Keyed by mode so that, e.g., an in-process pass
+    is never replayed under --subprocess.
+    """
+    args = list(cmd)
+    if "--output" in args:
+        index = args.index("--output")
+        del args[index:index + 2]
+    digest = hashlib.sha256(f"{run_mode()}:{shlex.join(args)}".encode()).hexdigest()
+    return RESULT_CACHE_DIR / f"{digest}.json"
+
+def load_cached_result(cmd):
+    """Return the recorded result of a command, or None if absent or recorded against another sepi.py."""
+    try:
+        entry = json.loads(result_cache_path(cmd).read_text())
+    except (OSError, ValueError):
+        return None
+    if entry.get("sepi_py_mtime") != SEPI_PATH.stat().st_mtime:
+        return None
+    return subprocess.CompletedProcess(entry["args"], entry["returncode"], entry["stdout"], entry["stderr"])
+
+def store_result(cmd, result):
+    """Record a command's result atomically via a temporary file."""
+    entry = {
+        "args": result.args,
+        "returncode": result.returncode,
+        "stdout": result.stdout,
+        "stderr": result.stderr,
+        "sepi_py_mtime": SEPI_PATH.stat().st_mtime,
+        "timestamp": time.time(),
+    }
+    path = result_cache_path(cmd)
+    try:
+        RESULT_CACHE_DIR.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(entry))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log.warning("[WARNING] Could not record result: %s", e)
+
+def purge_result_cache():
+    """Remove recorded results older than RESULT_CACHE_EXPIRY_HOURS."""
+    if not RESULT_CACHE_DIR.is_dir():
+        return
+    cutoff = time.time() - RESULT_CACHE_EXPIRY_HOURS * 3600
+    for path in RESULT_CACHE_DIR.glob("*.json"):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+async def run_command(cmd, description, expect_failure=False, use_cache=True):
+    """
+    Run a command and return success status. Progress is logged one record
+    per line of output, each naming the step, so concurrent steps stay legible.
+
+    Passing commands are recorded in the result cache and replayed on later
+    runs until sepi.py changes (see --no-cache and --refresh).
+    """
+    log.info("[*] Testing: %s\nCommand: %s", description, shlex.join(cmd))
+    use_cache = use_cache and not OPTIONS.no_cache
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
+        result = load_cached_result(cmd) if use_cache and not OPTIONS.refresh else None
+        cached = result is not None
+        if cached:
+            log.info("%s: replayed from result cache", description)
+        else:
+            result = await execute(cmd)
+
+        # Expected failures pass on a non-zero exit, everything else on zero
         if expect_failure:
-            # For commands that should fail
-            if result.returncode != 0:
-                print("[PASS] SUCCESS (failed as expected)")
-                return True
-            else:
-                print("[FAIL] FAILED (should have failed)")
-                print(f"STDOUT: {result.stdout}")
-                print(f"STDERR: {result.stderr}")
-                return False
+            passed = result.returncode != 0
         else:
-            # For commands that should succeed
-            if result.returncode == 0:
-                print("[PASS] SUCCESS")
-                return True
-            else:
-                print("[FAIL] FAILED")
-                print(f"STDOUT: {result.stdout}")
-                print(f"STDERR: {result.stderr}")
-                return False
+            passed = result.returncode == 0
+
+        if passed:
+            log.info("[PASS] %s%s", description, " (failed as expected)" if expect_failure else "")
+            if use_cache and not cached:
+                store_result(cmd, result)
+            return True
+
+        log.error(
+            "[FAIL] %s%s\nSTDOUT: %s\nSTDERR: %s",
+            description, " (should have failed)" if expect_failure else "",
+            result.stdout, result.stderr,
+        )
+        return False
     except subprocess.TimeoutExpired:
-        print("[TIMEOUT] 5 minutes")
+        log.error("[TIMEOUT] %s: 5 minutes", description)
         return False
     except Exception as e:
-        print(f"[ERROR] {e}")
+        log.error("[ERROR] %s: %s", description, e)
         return False
 
-def test_basic_functionality():
-    """Test basic command-line functionality."""
-    print("\n" + "="*60)
-    print("[TEST] COMPREHENSIVE ROBUSTNESS TEST FOR SEPI 2.0")
-    print("="*60)
-
-    # Test 1: Help message
-    success = run_command("python sepi.py --help", "Help message display")
-
-    # Test 2: Invalid arguments
-    success &= run_command("python sepi.py", "Error handling for missing required args", expect_failure=True)
-
-    # Test 3: Version info in header
-    with open('sepi.py', 'r') as f:
-        content = f.read()
-        if 'Version: 2.0' in content and 'SEPI 2.0' in content:
-            print("[PASS] Version info in header")
-            success &= True
-        else:
-            print("[FAIL] Version info missing")
-            success &= False
+_sepi_source = (None, b"")  # (st_mtime_ns, contents) of the last read of sepi.py
+
+def read_sepi_source():
+    """Return sepi.py's contents as bytes, re-reading only when the file changes."""
+    global _sepi_source
+    mtime_ns = SEPI_PATH.stat().st_mtime_ns
+    if _sepi_source[0] != mtime_ns:
+        _sepi_source = (mtime_ns, SEPI_PATH.read_bytes())
+    return _sepi_source[1]
+
+def output_prefix(name):
+    """Return an --output prefix for `name` inside this run's scratch directory."""
+    return str(RUN_DIR / name)
+
+# Flags most commands share; build_cmd() overrides them per command
+DEFAULT_FLAGS = {"organism": "Escherichia coli", "email": "test@example.com"}
+
+def build_cmd(**overrides):
+    """
+    Build a canonical sepi.py argv list from DEFAULT_FLAGS plus `overrides`.
+
+    Flags are emitted in sorted order, so equivalent commands share a result
+    cache key. True adds a bare switch; None or False leaves the flag out.
+    """
+    flags = {**DEFAULT_FLAGS, **overrides}
+    cmd = [PY, SEPI]
+    for name, value in sorted(flags.items()):
+        if value is None or value is False:
+            continue
+        cmd.append(f"--{name}")
+        if value is not True:
+            cmd.append(str(value))
+    return cmd
+
+# --- Command tables: (argv, description, expect_failure) ---
+BASIC_STEPS = [
+    # Help message
+    ([PY, SEPI, "--help"], "Help message display", False),
+    # Invalid arguments
+    ([PY, SEPI], "Error handling for missing required args", True),
+]
+
+YAML_STEPS = [
+    # Existing YAML config
+    ([PY, SEPI, "--config", "saureus_virulence.yml", "--output", output_prefix("test_yaml_config")], "YAML config loading", False),
+    # Invalid YAML
+    ([PY, SEPI, "--config", str(INVALID_YAML), "--output", output_prefix("test_invalid_yaml")], "Invalid YAML error handling", True),
+]
+
+PROTEIN_LIST_STEPS = [
+    # Existing protein list
+    (build_cmd(protein_list="saureus_targets.txt", output=output_prefix("test_protein_list")), "Protein list file loading", False),
+    # Comma-separated proteins
+    (build_cmd(proteins="AcrA,AcrB", output=output_prefix("test_comma_sep")), "Comma-separated protein input", False),
+    # Empty protein list
+    (build_cmd(protein_list=EMPTY_PROTEIN_LIST, output=output_prefix("test_empty")), "Empty protein list handling", True),
+]
+
+FILTER_STEPS = [
+    # Assembly level filter
+    (build_cmd(proteins="AcrA", assembly_level="complete_genome", output=output_prefix("test_assembly")), "Assembly level filtering", False),
+    # BioSample query
+    (build_cmd(proteins="AcrA", biosample_query="host=human", output=output_prefix("test_biosample")), "BioSample query filtering", False),
+]
+
+# Proteins each successful step must retrieve when NCBI answers from the canned
+# records in conftest.py; an empty tuple means the run must write no output files.
+# Steps not listed (e.g. --help) are only checked for their exit code.
+EXPECTED_PROTEINS = {
+    "YAML config loading": ("Hla",),  # Pvl, Sea and Tst have no canned record
+    "Protein list file loading": (),  # S. aureus targets, searched for in E. coli
+    "Comma-separated protein input": ("AcrA", "AcrB"),
+    "Assembly level filtering": ("AcrA",),
+    "BioSample query filtering": ("AcrA",),
+    "Multi-FASTA output": ("AcrA",),
+    "HTML report generation": ("AcrA",),
+    "Combined output formats": ("AcrA",),
+    "Non-existent organism handling": (),
+    "Invalid email handling": ("AcrA",),
+    "Legacy 'all' protein option": (),  # "all" only expands for PROTEIN_CONFIG keys
+}
+
+# Arguments argparse itself must reject: (argv, description). These are
+# checked against sepi.build_parser() directly, without running SEPI.
+# (Missing --organism/--email is only caught after parsing, so that case
+# stays in BASIC_STEPS.)
+PARSER_ERROR_STEPS = [
+    # Invalid assembly level
+    (build_cmd(proteins="AcrA", assembly_level="invalid_level")[2:], "Invalid assembly level handling"),
+]
+
+OUTPUT_STEPS = [
+    # Multi-FASTA output
+    (build_cmd(proteins="AcrA", multi_fasta=True, output=output_prefix("test_multifasta")), "Multi-FASTA output", False),
+    # HTML report
+    (build_cmd(proteins="AcrA", html_report=True, output=output_prefix("test_html")), "HTML report generation", False),
+    # Combined outputs
+    (build_cmd(proteins="AcrA", multi_fasta=True, html_report=True, output=output_prefix("test_combined")), "Combined output formats", False),
+]
+
+ERROR_STEPS = [
+    # Non-existent organism
+    (build_cmd(organism="NonExistentOrganism12345", proteins="FakeProtein", output=output_prefix("test_error")), "Non-existent organism handling", False),
+    # Invalid email
+    (build_cmd(proteins="AcrA", email="invalid-email", output=output_prefix("test_invalid_email")), "Invalid email handling", False),
+]
+
+LEGACY_STEPS = [
+    # Old-style organism names (should still work)
+    (build_cmd(proteins="all", output=output_prefix("test_legacy")), "Legacy 'all' protein option", False),
+]
+
+# Run twice with one output prefix; the second run must hit SEPI's cache
+CACHE_CMD = build_cmd(proteins="AcrA", output=output_prefix("test_cache"))
+
+async def _run_all(steps, fail_fast=None):
+    """
+    Run (cmd, description, expect_failure) steps and return (description, ok) pairs.
+
+    By default all steps are started together and every result is reported;
+    they overlap on worker processes or subprocesses, while in-process runs
+    still take turns. With fail_fast (--fail-fast) they run one at a time and
+    stop at the first failure.
+    """
+    if fail_fast is None:
+        fail_fast = OPTIONS.fail_fast
+
+    if fail_fast:
+        results = []
+        for cmd, description, expect_failure in steps:
+            ok = await run_command(cmd, description, expect_failure)
+            results.append((description, ok))
+            if not ok:
+                break
+        return results
+
+    async def run_step(step):
+        cmd, description, expect_failure = step
+        return description, await run_command(cmd, description, expect_failure)
+
+    return list(await asyncio.gather(*(run_step(step) for step in steps)))
+
+def assert_all_passed(results):
+    """Fail with the descriptions of every step that did not pass."""
+    failed = [description for description, ok in results if not ok]
+    assert not failed, f"Failed: {', '.join(failed)}"
+
+def check_version_header():
+    """Check that sepi.py's header carries the version info; returns a (description, ok) pair."""
+    source = read_sepi_source()
+    if b'Version: 2.0' in source and b'SEPI 2.0' in source:
+        log.info("[PASS] Version info in header")
+        return ("Version info in header", True)
+    log.error("[FAIL] Version info missing")
+    return ("Version info in header", False)
+
+def check_parser_rejects(argv, description):
+    """Check that SEPI's parser exits with a usage error for argv; returns a (description, ok) pair."""
+    try:
+        with contextlib.redirect_stderr(io.StringIO()):  # Keep argparse's usage message out of the report
+            sepi.build_parser().parse_args(argv)
+    except SystemExit as e:
+        if e.code == 2:
+            log.info("[PASS] %s (rejected by the parser)", description)
+            return (description, True)
+    log.error("[FAIL] %s (accepted by the parser)\nArguments: %s", description, shlex.join(argv))
+    return (description, False)
+
+def run_in_process_counting_cache_hits(cmd):
+    """Run a command in-process; returns (result, SEPI cache hits during the run)."""
+    with _IN_PROCESS_LOCK:  # Reentrant; held across the run so concurrent runs' hits are not counted
+        before = sepi.query_cache.hit_count
+        result = run_in_process(cmd)
+        return result, sepi.query_cache.hit_count - before
+
+async def run_counting_cache_hits(cmd):
+    """Run a command in-process or on a worker; returns (result, SEPI cache hits during the run)."""
+    if OPTIONS.workers:
+        result = await _worker_pool.run(cmd)  # The worker counts its own hits
+        return result, result.cache_hits
+    return await asyncio.to_thread(run_in_process_counting_cache_hits, cmd)
+
+async def check_cache_hits(cmd, description):
+    """Run a command (not under --subprocess) and pass only if it exits cleanly and hits SEPI's cache."""
+    log.info("[*] Testing: %s\nCommand: %s", description, shlex.join(cmd))
+    result, hits = await run_counting_cache_hits(cmd)
+    if result.returncode == 0 and hits > 0:
+        log.info("[PASS] %s (%d cache hits)", description, hits)
+        return True
+    log.error(
+        "[FAIL] %s (exit code %d, %d cache hits)\nSTDOUT: %s\nSTDERR: %s",
+        description, result.returncode, hits, result.stdout, result.stderr,
+    )
+    return False
+
+async def check_caching():
+    """
+    Run CACHE_CMD twice against an empty SEPI cache; returns (description, ok) pairs.
+
+    In-process and on workers, the second run must register hits in
+    sepi.query_cache; only --subprocess relies on the exit code alone. The
+    cache-file check remains as a sanity fallback for every mode.
+    """
+    # Clean up any existing cache for fresh test. run_suite() runs this group
+    # alone (EXCLUSIVE_TESTS), so no other run is using the cache meanwhile.
+    if os.path.exists('.sepi_cache'):
+        shutil.rmtree('.sepi_cache')
+    # sepi creates the directory only on import, so restore it as a fresh process would find it
+    os.makedirs('.sepi_cache', exist_ok=True)
+    if runs_in_process():
+        # In-process runs also keep the cache in memory
+        with _IN_PROCESS_LOCK:
+            sepi._CACHE = None
+            sepi._DIRTY = False
 
-    return success
+    results = []
+    # Replaying recorded results would skip SEPI's own cache entirely
+    description = "First run (populates cache)"
+    ok = await run_command(CACHE_CMD, description, use_cache=False)
+    results.append((description, ok))
+    if ok:  # The second run means nothing without the first
+        description = "Second run (uses cache)"
+        if not OPTIONS.subprocess:
+            results.append((description, await check_cache_hits(CACHE_CMD, description)))
+        else:
+            results.append((description, await run_command(CACHE_CMD, description, use_cache=False)))
 
-def test_yaml_config():
-    """Test YAML configuration functionality."""
-    print("\n[CONFIG] Testing YAML Configuration")
+    # Check if cache was created
+    if os.path.exists('.sepi_cache/query_cache.json'):
+        log.info("[PASS] Cache file created")
+        results.append(("Cache file created", True))
+    else:
+        log.error("[FAIL] Cache file not created")
+        results.append(("Cache file created", False))
+
+    return results
+
+# --- pytest entry points (run with `pytest`; see pytest.ini and conftest.py) ---
+STEP_FIELDS = "cmd, description, expect_failure"
+
+def step_ids(steps):
+    """Name parametrized cases after their descriptions (stable across xdist workers)."""
+    return [description for _, description, _ in steps]
+
+@pytest.fixture
+def sepi_run():
+    """Return a helper that runs an argv list and raises CalledProcessError on a non-zero exit."""
+    async def run(cmd):
+        result = await execute(cmd)
+        result.check_returncode()
+        return result
+    return run
+
+def parse_fasta(text):
+    """Return the (header, sequence) pairs of FASTA text."""
+    entries = []
+    for line in text.splitlines():
+        if line.startswith(">"):
+            entries.append((line[1:], []))
+        elif line:
+            entries[-1][1].append(line)
+    return [(header, "".join(lines)) for header, lines in entries]
+
+def fasta_entries(records):
+    """The (header, sequence) pairs SEPI should write for canned records."""
+    return [(f"{record['accession']} {record['definition']}", record["sequence"]) for record in records]
+
+def check_outputs(cmd, expected):
+    """
+    Check the files a successful run wrote against `expected`, the (protein name,
+    record) pairs it should have retrieved; no pairs means no output files at all.
+    """
+    args = sepi.build_parser().parse_args(cmd[2:])
+    if args.config:
+        # Config file settings override the command line (see sepi.run_workflow())
+        with open(args.config) as f:
+            settings = yaml.safe_load(f).get("settings", {})
+        args.multi_fasta = settings.get("multi_fasta", args.multi_fasta)
+        args.html_report = settings.get("html_report", args.html_report)
+    zip_path = Path(f"{args.output}.zip")
+    csv_path = Path(f"{args.output}_accessions.csv")
+    fasta_path = Path(f"{args.output}.fasta")
+    html_path = Path(f"{args.output}_report.html")
+
+    if not expected:
+        written = [str(path) for path in (zip_path, csv_path, fasta_path, html_path) if path.exists()]
+        assert not written, f"Run retrieved nothing but wrote {written}"
+        return
+    records = [record for _, record in expected]
+
+    # Accession report: the fixed header, then one row per protein in request order
+    csv_bytes = csv_path.read_bytes()
+    assert b"\r\n" not in csv_bytes, "Accession report has CRLF line endings"
+    reader = csv.DictReader(io.StringIO(csv_bytes.decode()))
+    rows = [(row["Protein_Name"], row["Accession_Number"], row["Protein_Length"]) for row in reader]
+    assert reader.fieldnames == sepi.CSV_FIELDNAMES
+    assert rows == [(name, record["accession"], str(len(record["sequence"]))) for name, record in expected]
+
+    # ZIP archive: one FASTA file per protein
+    with zipfile.ZipFile(zip_path) as zipf:
+        members = {f"{name}_{record['accession']}.fasta": record for name, record in expected}
+        assert sorted(zipf.namelist()) == sorted(members)
+        for member, record in members.items():
+            assert parse_fasta(zipf.read(member).decode()) == fasta_entries([record])
+
+    if args.multi_fasta:
+        assert parse_fasta(fasta_path.read_text()) == fasta_entries(records)
+    else:
+        assert not fasta_path.exists()
 
-    # Test existing YAML config
-    success = run_command("python sepi.py --config saureus_virulence.yml", "YAML config loading")
+    if args.html_report:
+        html = html_path.read_text()
+        assert all(record["accession"] in html for record in records)
+    else:
+        assert not html_path.exists()
+
+async def check_step(sepi_run, ncbi_records, cmd, description, expect_failure):
+    """
+    Run one table entry, expecting CalledProcessError for the failure cases.
+    Offline, successful runs listed in EXPECTED_PROTEINS also have their output
+    files checked against the canned records (the ncbi_records fixture).
+    """
+    if expect_failure:
+        with pytest.raises(subprocess.CalledProcessError):
+            await sepi_run(cmd)
+        return
+    await sepi_run(cmd)
+    if ncbi_records is not None and description in EXPECTED_PROTEINS:
+        check_outputs(cmd, [(name, ncbi_records[name]) for name in EXPECTED_PROTEINS[description]])
+
+@pytest.mark.parametrize(STEP_FIELDS, BASIC_STEPS, ids=step_ids(BASIC_STEPS))
+async def test_basic_functionality(sepi_run, ncbi_records, cmd, description, expect_failure):
+    await check_step(sepi_run, ncbi_records, cmd, description, expect_failure)
+
+def test_version_header():
+    _, ok = check_version_header()
+    assert ok
+
+@pytest.mark.parametrize(STEP_FIELDS, YAML_STEPS, ids=step_ids(YAML_STEPS))
+async def test_yaml_config(sepi_run, ncbi_records, cmd, description, expect_failure):
+    await check_step(sepi_run, ncbi_records, cmd, description, expect_failure)
+
+@pytest.mark.parametrize(STEP_FIELDS, PROTEIN_LIST_STEPS, ids=step_ids(PROTEIN_LIST_STEPS))
+async def test_protein_lists(sepi_run, ncbi_records, cmd, description, expect_failure):
+    await check_step(sepi_run, ncbi_records, cmd, description, expect_failure)
+
+@pytest.mark.parametrize(STEP_FIELDS, FILTER_STEPS, ids=step_ids(FILTER_STEPS))
+async def test_filters(sepi_run, ncbi_records, cmd, description, expect_failure):
+    await check_step(sepi_run, ncbi_records, cmd, description, expect_failure)
+
+@pytest.mark.parametrize(
+    "argv, description", PARSER_ERROR_STEPS, ids=[description for _, description in PARSER_ERROR_STEPS]
+)
+def test_parser_rejects(argv, description):
+    with pytest.raises(SystemExit) as excinfo:
+        sepi.build_parser().parse_args(argv)
+    assert excinfo.value.code == 2
+
+@pytest.mark.parametrize(STEP_FIELDS, OUTPUT_STEPS, ids=step_ids(OUTPUT_STEPS))
+async def test_output_formats(sepi_run, ncbi_records, cmd, description, expect_failure):
+    await check_step(sepi_run, ncbi_records, cmd, description, expect_failure)
+
+async def test_caching():
+    assert_all_passed(await check_caching())
+
+@pytest.mark.parametrize(STEP_FIELDS, ERROR_STEPS, ids=step_ids(ERROR_STEPS))
+async def test_error_handling(sepi_run, ncbi_records, cmd, description, expect_failure):
+    await check_step(sepi_run, ncbi_records, cmd, description, expect_failure)
+
+@pytest.mark.parametrize(STEP_FIELDS, LEGACY_STEPS, ids=step_ids(LEGACY_STEPS))
+async def test_legacy_compatibility(sepi_run, ncbi_records, cmd, description, expect_failure):
+    await check_step(sepi_run, ncbi_records, cmd, description, expect_failure)
 
-    # Test invalid YAML
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False) as f:
-        f.write("invalid: yaml: content: [\n")
-        invalid_yaml = f.name
+def cleanup_test_files():
+    """Clean up test-generated files."""
+    log.info("[CLEANUP] Cleaning up test files...")
+
+    # Everything run with --output lives in the scratch tree
+    shutil.rmtree(TEST_RUNS_ROOT, ignore_errors=True)
+    log.info("Removed directory: %s", TEST_RUNS_ROOT)
+
+    # Runs without --output (and older versions of this suite) write here
+    this_file = os.path.basename(__file__)  # Also matches 'test_'; never remove the suite itself
+    with os.scandir('.') as entries:
+        for entry in entries:
+            if not entry.name.startswith(PREFIXES) or entry.name == this_file:
+                continue
+            try:
+                if entry.is_file():
+                    os.remove(entry.path)
+                    log.info("Removed: %s", entry.name)
+                elif entry.is_dir():
+                    shutil.rmtree(entry.path)
+                    log.info("Removed directory: %s", entry.name)
+            except Exception as e:
+                log.warning("Could not remove %s: %s", entry.name, e)
 
-    success &= run_command(f"python sepi.py --config {invalid_yaml}", "Invalid YAML error handling", expect_failure=True)
-    os.unlink(invalid_yaml)
+# --- Standalone runner ---
+async def basic_functionality():
+    """Test basic command-line functionality."""
+    log.info("[BASIC] Testing Basic Functionality")
+    results = await _run_all(BASIC_STEPS)
+    results.append(check_version_header())
+    return results
 
-    return success
+async def yaml_config():
+    """Test YAML configuration functionality."""
+    log.info("[CONFIG] Testing YAML Configuration")
+    return await _run_all(YAML_STEPS)
 
-def test_protein_lists():
+async def protein_lists():
     """Test protein list functionality."""
-    print("\n[PROTEIN] Testing Protein List Features")
-
-    # Test with existing protein list
-    success = run_command('python sepi.py --organism "Escherichia coli" --protein_list saureus_targets.txt --output test_protein_list --email test@example.com', "Protein list file loading")
-
-    # Test with comma-separated proteins
-    success &= run_command('python sepi.py --organism "Escherichia coli" --proteins "AcrA,AcrB" --output test_comma_sep --email test@example.com', "Comma-separated protein input")
+    log.info("[PROTEIN] Testing Protein List Features")
+    return await _run_all(PROTEIN_LIST_STEPS)
 
-    # Test empty protein list
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        f.write("")  # Empty file
-        empty_list = f.name
-
-    success &= run_command(f'python sepi.py --organism "Escherichia coli" --protein_list {empty_list} --output test_empty --email test@example.com', "Empty protein list handling", expect_failure=True)
-    os.unlink(empty_list)
-
-    return success
-
-def test_filters():
+async def filters():
     """Test filtering functionality."""
-    print("\n[FILTER] Testing Filtering Features")
-
-    # Test assembly level filter
-    success = run_command('python sepi.py --organism "Escherichia coli" --proteins "AcrA" --assembly_level complete_genome --output test_assembly --email test@example.com', "Assembly level filtering")
-
-    # Test biosample query
-    success &= run_command('python sepi.py --organism "Escherichia coli" --proteins "AcrA" --biosample_query "host=human" --output test_biosample --email test@example.com', "BioSample query filtering")
+    log.info("[FILTER] Testing Filtering Features")
+    results = await _run_all(FILTER_STEPS)
+    results.extend(check_parser_rejects(argv, description) for argv, description in PARSER_ERROR_STEPS)
+    return results
 
-    # Test invalid assembly level
-    success &= run_command('python sepi.py --organism "Escherichia coli" --proteins "AcrA" --assembly_level invalid_level --output test_invalid --email test@example.com', "Invalid assembly level handling", expect_failure=True)
-
-    return success
-
-def test_output_formats():
+async def output_formats():
     """Test different output formats."""
-    print("\n[OUTPUT] Testing Output Formats")
-
-    # Test multi-FASTA output
-    success = run_command('python sepi.py --organism "Escherichia coli" --proteins "AcrA" --multi_fasta --output test_multifasta --email test@example.com', "Multi-FASTA output")
-
-    # Test HTML report
-    success &= run_command('python sepi.py --organism "Escherichia coli" --proteins "AcrA" --html_report --output test_html --email test@example.com', "HTML report generation")
-
-    # Test combined outputs
-    success &= run_command('python sepi.py --organism "Escherichia coli" --proteins "AcrA" --multi_fasta --html_report --output test_combined --email test@example.com', "Combined output formats")
-
-    return success
+    log.info("[OUTPUT] Testing Output Formats")
+    return await _run_all(OUTPUT_STEPS)
 
-def test_caching():
+async def caching():
     """Test caching functionality."""
-    print("\n[CACHE] Testing Caching System")
-
-    # Clean up any existing cache for fresh test
-    if os.path.exists('.sepi_cache'):
-        shutil.rmtree('.sepi_cache')
-
-    success = True
-
-    # Test cache usage by running same query twice
-    cmd = 'python sepi.py --organism "Escherichia coli" --proteins "AcrA" --output test_cache --email test@example.com'
-    success &= run_command(cmd, "First run (populates cache)")
-    success &= run_command(cmd, "Second run (uses cache)")
+    log.info("[CACHE] Testing Caching System")
+    return await check_caching()
 
-    # Check if cache was created
-    if os.path.exists('.sepi_cache'):
-        print("[PASS] Cache directory created")
-        if os.path.exists('.sepi_cache/query_cache.json'):
-            print("[PASS] Cache file created")
-        else:
-            print("[FAIL] Cache file not created")
-            success = False
-    else:
-        print("[FAIL] Cache directory not created")
-        success = False
-
-    return success
-
-def test_error_handling():
+async def error_handling():
     """Test error handling and edge cases."""
-    print("\n[ERROR] Testing Error Handling")
-
-    # Test with non-existent organism
-    success = run_command("python sepi.py --organism 'NonExistentOrganism12345' --proteins 'FakeProtein' --output test_error --email test@example.com", "Non-existent organism handling")
-
-    # Test with invalid email
-    success &= run_command('python sepi.py --organism "Escherichia coli" --proteins "AcrA" --output test_invalid_email --email invalid-email', "Invalid email handling")
-
-    # Test network timeout simulation (if possible)
-    # This would require mocking, but we'll test graceful degradation
-
-    return success
+    log.info("[ERROR] Testing Error Handling")
+    return await _run_all(ERROR_STEPS)
 
-def test_legacy_compatibility():
+async def legacy_compatibility():
     """Test backward compatibility with SEPI 1.0 style usage."""
-    print("\n[LEGACY] Testing Legacy Compatibility")
-
-    # Test with old-style organism names (should still work)
-    success = run_command('python sepi.py --organism "Escherichia coli" --proteins "all" --output test_legacy --email test@example.com', "Legacy 'all' protein option")
-
-    return success
-
-def cleanup_test_files():
-    """Clean up test-generated files."""
-    print("\n[CLEANUP] Cleaning up test files...")
+    log.info("[LEGACY] Testing Legacy Compatibility")
+    return await _run_all(LEGACY_STEPS)
+
+# Test groups in summary order
+TESTS = [
+    ("Basic Functionality", basic_functionality),
+    ("YAML Configuration", yaml_config),
+    ("Protein Lists", protein_lists),
+    ("Filters", filters),
+    ("Output Formats", output_formats),
+    ("Caching", caching),
+    ("Error Handling", error_handling),
+    ("Legacy Compatibility", legacy_compatibility),
+]
+
+# Groups that reset and inspect SEPI's shared cache (.sepi_cache and, in-process,
+# sepi._CACHE), so they run alone once the concurrent groups have finished
+EXCLUSIVE_TESTS = {"Caching"}
+
+async def run_group(test_name, test_group):
+    """Run a test group with its records tagged by test_name; returns its success."""
+    current_test.set(test_name)  # Runs in its own task, so this stays local to the group
+    try:
+        results = await test_group()
+        return all(ok for _, ok in results)
+    except Exception as e:
+        log.error("[ERROR] %s", e)
+        return False
 
-    test_prefixes = ['test_', 'ecoli_test', 'SEPI_output']
-    for file in os.listdir('.'):
-        if any(file.startswith(prefix) for prefix in test_prefixes):
-            try:
-                if os.path.isfile(file):
-                    os.remove(file)
-                    print(f"Removed: {file}")
-                elif os.path.isdir(file):
-                    shutil.rmtree(file)
-                    print(f"Removed directory: {file}")
-            except Exception as e:
-                print(f"Could not remove {file}: {e}")
+async def run_suite():
+    """
+    Run the test groups concurrently on one event loop, at most
+    os.cpu_count() at a time, then the EXCLUSIVE_TESTS one by one.
+    Their commands only overlap in separate processes (the default --workers
+    pool, or --subprocess); with --in-process they execute one at a time.
+    Returns (test_name, success) pairs in TESTS order.
+    """
+    global _worker_pool
+    semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+    if OPTIONS.workers:
+        _worker_pool = WorkerPool(max(1, (os.cpu_count() or 1) - 2))
+        await _worker_pool.start()
+
+    async def bounded(test_name, test_group):
+        async with semaphore:
+            return await run_group(test_name, test_group)
+
+    shared = [test for test in TESTS if test[0] not in EXCLUSIVE_TESTS]
+    exclusive = [test for test in TESTS if test[0] in EXCLUSIVE_TESTS]
+    try:
+        outcomes = dict(zip(
+            (test_name for test_name, _ in shared),
+            await asyncio.gather(*(bounded(*test) for test in shared))
+        ))
+        for test in exclusive:
+            outcomes[test[0]] = await asyncio.create_task(run_group(*test))  # Own task: see run_group()
+    finally:
+        if _worker_pool is not None:
+            await _worker_pool.close()
+    return [(test_name, outcomes[test_name]) for test_name, _ in TESTS]
+
+def parse_args(argv=None):
+    """Parse the suite's own command-line options."""
+    parser = argparse.ArgumentParser(description="SEPI 2.0 robustness test suite")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run commands through sepi.main() in this interpreter, one at a time (no process startup; serial)."
+    )
+    mode.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="Run every command in a fresh `python sepi.py` process (CI parity)."
+    )
+    mode.add_argument(
+        "--workers",
+        action="store_true",
+        help="Run commands on a pool of pre-warmed `python sepi.py --worker` processes, cores - 2 (the default)."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Neither replay nor record command results in {RESULT_CACHE_DIR}."
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-run every command and overwrite its recorded result."
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Run each test's commands one at a time and stop at its first failure (local debugging)."
+    )
+    args = parser.parse_args(argv)
+    # In-process runs are serialized (see _IN_PROCESS_LOCK), so default to the parallel worker pool
+    args.workers = not (args.in_process or args.subprocess)
+    return args
+
+def start_logging():
+    """
+    Route the suite's records through a queue to a single writer thread, so
+    records from concurrent tests never tear. Returns the started listener.
+
+    The handler goes on the suite's own logger rather than the root logger:
+    in-process runs call sepi.setup_logging(), which replaces root's handlers.
+    """
+    records = queue.Queue()
+    log.addFilter(_GroupNameFilter())  # On the logger: it must run in the emitting task's context
+    log.addHandler(logging.handlers.QueueHandler(records))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(prefix)s%(message)s"))
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    return listener
 
 def main():
     """Run all robustness tests."""
-    print("[START] Starting SEPI 2.0 Robustness Test Suite")
-    print("This will test all features and edge cases...")
+    global OPTIONS
+    OPTIONS = parse_args()
+    purge_result_cache()
+    listener = start_logging()
 
-    # Run all tests
-    results = []
-    results.append(("Basic Functionality", test_basic_functionality()))
-    results.append(("YAML Configuration", test_yaml_config()))
-    results.append(("Protein Lists", test_protein_lists()))
-    results.append(("Filters", test_filters()))
-    results.append(("Output Formats", test_output_formats()))
-    results.append(("Caching", test_caching()))
-    results.append(("Error Handling", test_error_handling()))
-    results.append(("Legacy Compatibility", test_legacy_compatibility()))
-
-    # Summary
-    print("\n" + "="*60)
-    print("[SUMMARY] TEST RESULTS SUMMARY")
-    print("="*60)
-
-    passed = 0
-    total = len(results)
-
-    for test_name, success in results:
-        status = "[PASS] SUCCESS" if success else "[FAIL] FAILED"
-        print(f"{test_name}: {status}")
-        if success:
-            passed += 1
-
-    print(f"\nOverall: {passed}/{total} tests passed")
-
-    if passed == total:
-        print("[SUCCESS] ALL TESTS PASSED! SEPI 2.0 is production-ready!")
-        cleanup_test_files()
-        return True
-    else:
-        print("[WARNING] Some tests failed. Please review and fix issues.")
-        return False
+    try:
+        log.info("[START] Starting SEPI 2.0 Robustness Test Suite")
+        log.info("This will test all features and edge cases...")
+        log.info("\n" + "="*60)
+        log.info("[TEST] COMPREHENSIVE ROBUSTNESS TEST FOR SEPI 2.0")
+        log.info("="*60)
+
+        results = asyncio.run(run_suite())
+
+        # Summary
+        log.info("\n" + "="*60)
+        log.info("[SUMMARY] TEST RESULTS SUMMARY")
+        log.info("="*60)
+
+        passed = 0
+        total = len(results)
+
+        for test_name, success in results:
+            if success:
+                log.info("%s: [PASS] SUCCESS", test_name)
+                passed += 1
+            else:
+                log.error("%s: [FAIL] FAILED", test_name)
+
+        log.info("\nOverall: %d/%d tests passed", passed, total)
+
+        if passed == total:
+            log.info("[SUCCESS] ALL TESTS PASSED! SEPI 2.0 is production-ready!")
+            cleanup_test_files()
+            return True
+        else:
+            log.warning("[WARNING] Some tests failed. Please review and fix issues.")
+            return False
+    finally:
+        listener.stop()  # Drains the queue before the process exits
 
 if __name__ == "__main__":
     success = main()